@@ -1,13 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import json
 import time
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import logging
 from datetime import datetime, timedelta
 import os
-from requests.exceptions import RequestException
+from requests.exceptions import RequestException, Timeout, ConnectionError as RequestsConnectionError
 import random
+import threading
+from price_store import PriceStore, RefreshScheduler, format_timestamp
+from page_parser import extract_form_tokens, extract_price_rows
+from scrape_cache import ScrapeCache
+from price_index import PriceIndex, QueryError, FILTER_FIELDS
+from metrics import Instrumentation, Gauge, NULL_TRACE
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,6 +28,266 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15"
 ]
 
+ALL_STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh",
+    "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir",
+    "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra",
+    "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab",
+    "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal", "Delhi"
+]
+
+ALL_COMMODITIES = [
+    "Potato", "Tomato", "Onion", "Rice", "Wheat", "Maize", "Apple", "Banana",
+    "Orange", "Mango", "Grapes", "Watermelon", "Coconut", "Sugarcane",
+    "Cotton", "Jute", "Coffee", "Tea", "Milk", "Egg", "Fish", "Chicken",
+    "Mutton", "Beef", "Pork"
+]
+
+# Fan-out / politeness settings for upstream scraping
+SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 8))
+SCRAPE_RATE = float(os.environ.get('SCRAPE_RATE', 4.0))        # requests per second per host
+SCRAPE_MIN_RATE = float(os.environ.get('SCRAPE_MIN_RATE', 0.5))
+SCRAPE_BURST = int(os.environ.get('SCRAPE_BURST', 4))
+SCRAPE_MAX_RETRIES = int(os.environ.get('SCRAPE_MAX_RETRIES', 3))
+SCRAPE_TIMEOUT = float(os.environ.get('SCRAPE_TIMEOUT', 10))
+FORM_TOKEN_TTL = float(os.environ.get('FORM_TOKEN_TTL', 600))
+FORM_TOKEN_WAIT = float(os.environ.get('FORM_TOKEN_WAIT', 60))   # max wait on another worker's token refresh
+
+# In-process cache of parsed scrape results
+SCRAPE_CACHE_SIZE = int(os.environ.get('SCRAPE_CACHE_SIZE', 2000))            # entries, 0 disables
+SCRAPE_CACHE_TTL = float(os.environ.get('SCRAPE_CACHE_TTL', 900))
+SCRAPE_CACHE_STALE_TTL = float(os.environ.get('SCRAPE_CACHE_STALE_TTL', 3600))  # extra age served while revalidating
+
+# Local price store and background refresh
+PRICE_DB_PATH = os.environ.get('PRICE_DB_PATH', os.path.join('data', 'prices.db'))
+REFRESH_INTERVAL = float(os.environ.get('REFRESH_INTERVAL', 300))     # seconds between scheduler ticks, 0 disables
+REFRESH_MAX_AGE = float(os.environ.get('REFRESH_MAX_AGE', 6 * 3600))  # slices older than this are re-scraped
+REFRESH_BATCH = int(os.environ.get('REFRESH_BATCH', 100))             # max slices refreshed per tick
+
+QUERY_DEFAULT_LIMIT = 100
+QUERY_MAX_LIMIT = 1000
+
+# Stage timing / Prometheus metrics; SCRAPE_TRACE_LOG adds a JSONL line per scrape
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+SCRAPE_TRACE_LOG = os.environ.get('SCRAPE_TRACE_LOG')
+
+instrumentation = Instrumentation(METRICS_ENABLED, SCRAPE_TRACE_LOG)
+
+# Point AGMARKNET_URL at bench/stand_in_server.py to scrape a local stand-in instead of the live site
+PRICE_TRENDS_URL = os.environ.get('AGMARKNET_URL', "https://agmarknet.gov.in/PriceTrends/SA_Month_PriMV.aspx")
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate adapts to upstream health.
+
+    Rate is halved on 5xx/timeouts and grows back additively on success, so a
+    struggling host is backed off quickly and recovered gently.
+    """
+
+    def __init__(self, rate, burst, min_rate):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            backoff = min(30.0, (2 ** self.failures) * 0.5) * random.uniform(0.8, 1.2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + backoff)
+            self.tokens = 0.0
+            return backoff
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+def get_host_limiter(url):
+    host = urlparse(url).netloc
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = TokenBucket(SCRAPE_RATE, SCRAPE_BURST, SCRAPE_MIN_RATE)
+            _host_limiters[host] = limiter
+        return limiter
+
+class FormTokensRejected(RequestException):
+    """Upstream refused a postback because the form tokens it carried are stale."""
+
+def upstream_request(session, method, url, trace=NULL_TRACE, rejected=None, **kwargs):
+    """Send a request through the host rate limiter, retrying 5xx responses and timeouts.
+
+    rejected, if given, is checked against every response before the 5xx handling so a
+    token rejection surfaces as FormTokensRejected at once instead of being retried.
+    """
+    limiter = get_host_limiter(url)
+    kwargs.setdefault('timeout', SCRAPE_TIMEOUT)
+    attempt = 0
+    while True:
+        with trace.stage('rate_wait'):
+            limiter.acquire()
+        try:
+            with trace.stage(method.lower()):
+                response = session.request(method, url, **kwargs)
+                if rejected is not None and rejected(response):
+                    # The host answered fine; backing off or retrying would not help
+                    limiter.success()
+                    raise FormTokensRejected(f"Form tokens rejected by {url}", response=response)
+                if response.status_code >= 500:
+                    raise requests.HTTPError(f"{response.status_code} Server Error for url: {url}", response=response)
+        except (Timeout, RequestsConnectionError, requests.HTTPError) as e:
+            error = e
+        else:
+            limiter.success()
+            response.raise_for_status()
+            return response
+        attempt += 1
+        backoff = limiter.failure()
+        if attempt > SCRAPE_MAX_RETRIES:
+            raise error
+        logger.warning(f"Upstream {method} failed ({error}); retry {attempt}/{SCRAPE_MAX_RETRIES}, host backoff {backoff:.1f}s")
+
+_upstream_session = None
+_upstream_session_lock = threading.Lock()
+
+def get_upstream_session():
+    global _upstream_session
+    with _upstream_session_lock:
+        if _upstream_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(SCRAPE_WORKERS, 1))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _upstream_session = session
+        return _upstream_session
+
+def upstream_connection_stats():
+    """Return (requests sent, connections opened) across the shared session's pools."""
+    sent = opened = 0
+    session = _upstream_session
+    if session is None:
+        return sent, opened
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                sent += pool.num_requests
+                opened += pool.num_connections
+    return sent, opened
+
+class _TokenRefresh:
+    def __init__(self):
+        self.done = threading.Event()
+        self.tokens = None
+        self.error = None
+
+class FormTokenCache:
+    """Caches the ASP.NET hidden form tokens so postbacks can skip the GET.
+
+    When the tokens expire one caller re-fetches them and concurrent callers wait on that
+    fetch. The GET runs outside the lock, and waiters give up after wait_timeout seconds.
+    """
+
+    def __init__(self, ttl, wait_timeout):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.tokens = None
+        self.fetched_at = 0.0
+        self.refresh = None
+        self.gets = 0
+        self.reuses = 0
+        self.lock = threading.Lock()
+
+    def get(self, session, url, headers, trace=NULL_TRACE):
+        with self.lock:
+            if self.tokens is not None and time.monotonic() - self.fetched_at < self.ttl:
+                self.reuses += 1
+                return self.tokens, True
+            refresh = self.refresh
+            leader = refresh is None
+            if leader:
+                refresh = self.refresh = _TokenRefresh()
+            else:
+                self.reuses += 1
+        if not leader:
+            with trace.stage('token_wait'):
+                if not refresh.done.wait(self.wait_timeout):
+                    raise Timeout(f"Gave up after {self.wait_timeout:.0f}s waiting for a form token refresh")
+            if refresh.error is not None:
+                raise refresh.error
+            return refresh.tokens, False
+        try:
+            response = upstream_request(session, 'GET', url, trace, headers=headers)
+            with trace.stage('parse_tokens'):
+                refresh.tokens = extract_form_tokens(response.text)
+        except Exception as e:
+            refresh.error = e
+            raise
+        finally:
+            with self.lock:
+                if refresh.error is None:
+                    self.tokens = refresh.tokens
+                    self.fetched_at = time.monotonic()
+                    self.gets += 1
+                self.refresh = None
+            refresh.done.set()
+        return refresh.tokens, False
+
+    def invalidate(self, tokens):
+        with self.lock:
+            if self.tokens is tokens:
+                self.tokens = None
+
+    def stats(self):
+        with self.lock:
+            return {"token_gets": self.gets, "gets_saved": self.reuses}
+
+form_tokens = FormTokenCache(FORM_TOKEN_TTL, FORM_TOKEN_WAIT)
+
+def upstream_stats():
+    stats = form_tokens.stats()
+    sent, opened = upstream_connection_stats()
+    stats.update({"requests_sent": sent, "connections_opened": opened,
+                  "handshakes_saved": max(sent - opened, 0)})
+    return stats
+
+def is_form_page(html, state_code):
+    # A rejected postback renders the blank form: our state is not the selected option
+    return '__VIEWSTATE' in html and f'selected="selected" value="{state_code}"' not in html
+
+# Phrases in ASP.NET's error page when a postback fails viewstate / event validation
+TOKEN_ERROR_MARKERS = ('viewstate', 'eventvalidation', 'event validation', 'invalid postback or callback argument')
+
+def tokens_rejected(response, state_code):
+    """True when a postback response shows upstream refused its form tokens."""
+    if response.status_code >= 500:
+        body = response.text.lower()
+        return any(marker in body for marker in TOKEN_ERROR_MARKERS)
+    return is_form_page(response.text, state_code)
+
 def get_state_code(state_name):
     state_mapping = {
         "andhra pradesh": "01", "arunachal pradesh": "02", "assam": "03", "bihar": "04",
@@ -42,122 +311,317 @@ def get_commodity_code(commodity_name):
     }
     return commodity_mapping.get(commodity_name.lower())
 
+scrape_cache = ScrapeCache(SCRAPE_CACHE_SIZE, SCRAPE_CACHE_TTL, SCRAPE_CACHE_STALE_TTL)
+
 def get_data_from_price_trends(state, commodity, market):
     try:
-        logger.info(f"Fetching price trends for {commodity} in {market or 'ALL MARKETS'}, {state}")
-
-        url = "https://agmarknet.gov.in/PriceTrends/SA_Month_PriMV.aspx"
-        session = requests.Session()
-        headers = {
-            "User-Agent": random.choice(USER_AGENTS),
-            "Referer": "https://agmarknet.gov.in/",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Connection": "keep-alive"
-        }
-
-        response = session.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        viewstate = soup.find('input', {'name': '__VIEWSTATE'})['value']
-        viewstategenerator = soup.find('input', {'name': '__VIEWSTATEGENERATOR'})['value']
-        eventvalidation = soup.find('input', {'name': '__EVENTVALIDATION'})['value']
-
-        state_code = get_state_code(state)
-        commodity_code = get_commodity_code(commodity)
-        if not state_code or not commodity_code:
-            logger.warning(f"Invalid state or commodity: {state}, {commodity}")
-            return []
+        records = cached_price_trends(state, commodity, market)
+        if market:
+            records = [record for record in records if record["Market"].lower() == market.lower()]
+        return records
+    except Exception as e:
+        logger.error(f"Error in price trends scraping: {e}")
+        return []
 
+def cached_price_trends(state, commodity, market, year=None, month=None, allow_stale=True):
+    """scrape_price_trends behind the shared cache, coalescing identical concurrent scrapes."""
+    state_code = get_state_code(state)
+    commodity_code = get_commodity_code(commodity)
+    if not state_code or not commodity_code:
+        return scrape_price_trends(state, commodity, market, year, month)
+    if year is None or month is None:
         today = datetime.now()
-        month = today.month
-        year = today.year
-        form_data = {
-            '__VIEWSTATE': viewstate,
-            '__VIEWSTATEGENERATOR': viewstategenerator,
-            '__EVENTVALIDATION': eventvalidation,
-            'ctl00$cphBody$cboYear': str(year),
-            'ctl00$cphBody$cboMonth': str(month),
-            'ctl00$cphBody$cboState': state_code,
-            'ctl00$cphBody$cboCommodity': commodity_code,
-            'ctl00$cphBody$btnSubmit': 'Submit'
-        }
-
-        time.sleep(random.uniform(1.5, 3))
-        response = session.post(url, data=form_data, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table', {'id': 'cphBody_gridRecords'}) or soup.find('table', {'id': 'gvReportData'})
-        if not table:
-            logger.warning("No data table found")
-            return []
-
-        rows = table.find_all('tr')
-        if len(rows) <= 1:
-            logger.warning("No data rows in the table")
-            return []
-
-        json_list = []
-        for i, row in enumerate(rows[1:], 1):
-            cells = row.find_all('td')
-            if len(cells) >= 6:
-                market_name = cells[0].text.strip()
-                json_list.append({
-                    "S.No": str(i),
-                    "Date": f"{month}/{year}",
-                    "Market": market_name,
-                    "Commodity": commodity,
-                    "Variety": cells[1].text.strip(),
-                    "Min Price": cells[2].text.strip(),
-                    "Max Price": cells[3].text.strip(),
-                    "Modal Price": cells[4].text.strip()
-                })
-
-        logger.info(f"Collected {len(json_list)} records for {commodity} in {market or 'ALL MARKETS'}, {state}")
-        return json_list
+        year, month = today.year, today.month
+    key = (state_code, commodity_code, year, month)
+    records = scrape_cache.get(key, lambda: scrape_price_trends(state, commodity, market, year, month), allow_stale)
+    return list(records)
+
+def scrape_price_trends(state, commodity, market, year=None, month=None):
+    """Scrape one (state, commodity) month from agmarknet, raising on upstream failure."""
+    logger.info(f"Fetching price trends for {commodity} in {market or 'ALL MARKETS'}, {state}")
 
+    if year is None or month is None:
+        today = datetime.now()
+        year, month = today.year, today.month
+    trace = instrumentation.trace(state, commodity, year=year, month=month)
+
+    state_code = get_state_code(state)
+    commodity_code = get_commodity_code(commodity)
+    if not state_code or not commodity_code:
+        logger.warning(f"Invalid state or commodity: {state}, {commodity}")
+        trace.finish('invalid')
+        return []
+
+    try:
+        json_list = _scrape_price_trends(trace, state, state_code, commodity, commodity_code, year, month)
     except Exception as e:
-        logger.error(f"Error in price trends scraping: {e}")
+        trace.finish('error', error=e)
+        raise
+    trace.finish('ok' if json_list else 'empty', records=len(json_list))
+    logger.info(f"Collected {len(json_list)} records for {commodity} in {market or 'ALL MARKETS'}, {state}")
+    return json_list
+
+def _scrape_price_trends(trace, state, state_code, commodity, commodity_code, year, month):
+    url = PRICE_TRENDS_URL
+    session = get_upstream_session()
+    headers = {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Referer": "https://agmarknet.gov.in/",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Connection": "keep-alive"
+    }
+
+    form_data = {
+        'ctl00$cphBody$cboYear': str(year),
+        'ctl00$cphBody$cboMonth': str(month),
+        'ctl00$cphBody$cboState': state_code,
+        'ctl00$cphBody$cboCommodity': commodity_code,
+        'ctl00$cphBody$btnSubmit': 'Submit'
+    }
+
+    for attempt in range(2):
+        tokens, cached = form_tokens.get(session, url, headers, trace)
+        # Only reused tokens can have gone stale; other failures propagate from upstream_request
+        check = (lambda response: tokens_rejected(response, state_code)) if cached and not attempt else None
+        try:
+            response = upstream_request(session, 'POST', url, trace, check,
+                                        data={**tokens, **form_data}, headers=headers)
+        except FormTokensRejected:
+            logger.info("Cached form tokens rejected by upstream, refreshing")
+            form_tokens.invalidate(tokens)
+            continue
+        break
+
+    with trace.stage('parse'):
+        rows = extract_price_rows(response.text)
+    if rows is None:
+        logger.warning("No data table found")
+        return []
+
+    if len(rows) <= 1:
+        logger.warning("No data rows in the table")
         return []
 
+    json_list = []
+    for i, cells in enumerate(rows[1:], 1):
+        if len(cells) >= 6:
+            json_list.append({
+                "S.No": str(i),
+                "Date": f"{month}/{year}",
+                "Market": cells[0],
+                "Commodity": commodity,
+                "Variety": cells[1],
+                "Min Price": cells[2],
+                "Max Price": cells[3],
+                "Modal Price": cells[4]
+            })
+    return json_list
+
 app = Flask(__name__)
 
 @app.route('/')
 def home():
     return jsonify({"message": "Welcome to KrishiMitra API", "usage": "/all-data"})
 
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(scrape_cache.stats())
+
+def scrape_job(state, commodity, year=None, month=None, allow_stale=True):
+    try:
+        logger.info(f"Scraping {commodity} for {state}")
+        return cached_price_trends(state, commodity, None, year, month, allow_stale), None
+    except Exception as e:
+        logger.warning(f"Error fetching {commodity} for {state}: {str(e)}")
+        return [], e
+
+def run_sweep(jobs, workers=None, year=None, month=None, allow_stale=True):
+    """Scrape (state, commodity) jobs on a bounded pool, yielding (job, records, error) as each completes."""
+    workers = max(1, min(workers or SCRAPE_WORKERS, len(jobs) or 1))
+    started = time.monotonic()
+    before = upstream_stats()
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(scrape_job, state, commodity, year, month, allow_stale): (state, commodity)
+                   for state, commodity in jobs}
+        try:
+            for future in as_completed(futures):
+                job = futures.pop(future)
+                records, error = future.result()
+                count += len(records)
+                yield job, records, error
+        finally:
+            # A consumer that stops early (e.g. a disconnected stream) should not wait out the sweep
+            for future in futures:
+                future.cancel()
+    after = upstream_stats()
+    instrumentation.record('sweep', time.monotonic() - started, 'ok')
+    logger.info(f"Sweep of {len(jobs)} jobs finished in {time.monotonic() - started:.1f}s with {count} records")
+    logger.info(f"Upstream reuse for sweep: {({key: after[key] - before[key] for key in after})}")
+
+price_store = PriceStore(PRICE_DB_PATH)
+
+def refresh_slices(pairs, year=None, month=None):
+    """Re-scrape pairs into the store; failed slices keep their old data and stay stale."""
+    if year is None or month is None:
+        today = datetime.now()
+        year, month = today.year, today.month
+    batch = []
+    for (state, commodity), records, error in run_sweep(pairs, year=year, month=month, allow_stale=False):
+        if error is None:
+            batch.append(((state, commodity, year, month), records))
+        if len(batch) >= 25:
+            price_store.replace_slices(batch)
+            batch = []
+    if batch:
+        price_store.replace_slices(batch)
+
+PRICE_INDEX_MONTHS = 3
+_price_indexes = OrderedDict()
+_price_indexes_lock = threading.Lock()
+
+def get_price_index(year, month):
+    """Return the index for a month, rebuilding it only when the store has changed."""
+    generation = price_store.generation(year, month)
+    with _price_indexes_lock:
+        cached = _price_indexes.get((year, month))
+        if cached and cached[0] == generation:
+            _price_indexes.move_to_end((year, month))
+            return cached[1]
+    index = PriceIndex(price_store.iter_records(year, month))
+    with _price_indexes_lock:
+        _price_indexes[(year, month)] = (generation, index)
+        _price_indexes.move_to_end((year, month))
+        # Only the most recently queried months are kept in memory
+        while len(_price_indexes) > PRICE_INDEX_MONTHS:
+            _price_indexes.popitem(last=False)
+    return index
+
+def query_arg_values(name):
+    # Not comma-split: market and variety names can contain commas; repeat the parameter instead
+    return [value.strip() for value in request.args.getlist(name) if value.strip()]
+
+def query_arg_number(name, cast):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value.replace(',', ''))
+    except ValueError:
+        raise QueryError(f"Invalid value for '{name}': {value}")
+
+@app.route('/request')
+def query_prices():
+    try:
+        today = datetime.now()
+        year = query_arg_number('year', int) or today.year
+        month = query_arg_number('month', int) or today.month
+        filters = {field: query_arg_values(field) for field in FILTER_FIELDS}
+        filters = {field: values for field, values in filters.items() if values}
+        sort = request.args.get('sort', 'modal_price')
+        descending = sort.startswith('-')
+        limit = query_arg_number('limit', int)
+        limit = QUERY_DEFAULT_LIMIT if limit is None else limit
+        if not 1 <= limit <= QUERY_MAX_LIMIT:
+            raise QueryError(f"'limit' must be between 1 and {QUERY_MAX_LIMIT}")
+        records, total, next_cursor = get_price_index(year, month).query(
+            filters,
+            min_modal=query_arg_number('min_price', float),
+            max_modal=query_arg_number('max_price', float),
+            sort=sort.lstrip('-'),
+            descending=descending,
+            limit=limit,
+            cursor=request.args.get('cursor')
+        )
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"data": records, "count": total, "next_cursor": next_cursor})
+
+refresh_scheduler = None
+_refresh_scheduler_lock = threading.Lock()
+
+@app.before_request
+def start_refresh_scheduler():
+    # Started on the first request rather than at import so CLI tools (e.g. backfill.py) can import the app
+    global refresh_scheduler
+    if refresh_scheduler is not None or REFRESH_INTERVAL <= 0:
+        return
+    with _refresh_scheduler_lock:
+        if refresh_scheduler is None:
+            pairs = [(state, commodity) for state in ALL_STATES for commodity in ALL_COMMODITIES]
+            scheduler = RefreshScheduler(price_store, pairs, refresh_slices,
+                                         REFRESH_INTERVAL, REFRESH_MAX_AGE, REFRESH_BATCH)
+            scheduler.start()
+            refresh_scheduler = scheduler
+
+def ndjson_line(obj):
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+def stream_live_sweep(jobs):
+    for (state, commodity), records, error in run_sweep(jobs):
+        if error is not None:
+            yield ndjson_line({"State": state, "Commodity": commodity, "Status": "error", "Error": str(error)})
+        elif not records:
+            yield ndjson_line({"State": state, "Commodity": commodity, "Status": "empty"})
+        else:
+            yield "".join(ndjson_line({"State": state, **record}) for record in records)
+
+def stream_stored_records(year, month):
+    # Interleave the same empty-slice markers as the live stream, in (state, commodity) order
+    empty = iter(price_store.empty_slices(year, month))
+    pending = next(empty, None)
+    for record in price_store.iter_records(year, month):
+        while pending is not None and pending < (record["State"], record["Commodity"]):
+            yield ndjson_line({"State": pending[0], "Commodity": pending[1], "Status": "empty"})
+            pending = next(empty, None)
+        yield ndjson_line(record)
+    while pending is not None:
+        yield ndjson_line({"State": pending[0], "Commodity": pending[1], "Status": "empty"})
+        pending = next(empty, None)
+
 @app.route('/all-data')
 def fetch_all_data():
-    states = [
-        "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh",
-        "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu and Kashmir",
-        "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra",
-        "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab",
-        "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
-        "Uttar Pradesh", "Uttarakhand", "West Bengal", "Delhi"
-    ]
-    commodities = [
-        "Potato", "Tomato", "Onion", "Rice", "Wheat", "Maize", "Apple", "Banana",
-        "Orange", "Mango", "Grapes", "Watermelon", "Coconut", "Sugarcane",
-        "Cotton", "Jute", "Coffee", "Tea", "Milk", "Egg", "Fish", "Chicken",
-        "Mutton", "Beef", "Pork"
-    ]
-
-    all_data = []
-    for state in states:
-        for commodity in commodities:
-            try:
-                logger.info(f"Scraping {commodity} for {state}")
-                data = get_data_from_price_trends(state, commodity, None)
-                if data:
-                    all_data.extend(data)
-            except Exception as e:
-                logger.warning(f"Error fetching {commodity} for {state}: {str(e)}")
-                continue
-
-    return jsonify(all_data if all_data else {"message": "No data fetched"})
+    today = datetime.now()
+    live = request.args.get('source') == 'live'
+    jobs = [(state, commodity) for state in ALL_STATES for commodity in ALL_COMMODITIES]
+
+    if request.args.get('format') == 'ndjson':
+        lines = stream_live_sweep(jobs) if live else stream_stored_records(today.year, today.month)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    if live:
+        results = {job: records for job, records, error in run_sweep(jobs)}
+        all_data = []
+        for job in jobs:
+            all_data.extend(results.get(job) or [])
+        with instrumentation.time_stage('serialize'):
+            return jsonify(all_data if all_data else {"message": "No data fetched"})
+
+    with instrumentation.time_stage('store_read'):
+        all_data = list(price_store.iter_records(today.year, today.month))
+    with instrumentation.time_stage('serialize'):
+        response = jsonify(all_data if all_data else {"message": "No data fetched"})
+    freshness = price_store.slice_freshness(today.year, today.month)
+    if freshness:
+        response.headers['X-Data-Oldest-Refresh'] = format_timestamp(min(freshness.values()))
+        response.headers['X-Data-Newest-Refresh'] = format_timestamp(max(freshness.values()))
+    return response
+
+instrumentation.registry.register(Gauge(
+    "agmarknet_scrape_cache", "Scrape cache counters and size", lambda: {
+        (name,): value for name, value in scrape_cache.stats().items()
+    }, ("stat",)))
+instrumentation.registry.register(Gauge(
+    "agmarknet_upstream", "Upstream connection and form-token reuse", lambda: {
+        (name,): value for name, value in upstream_stats().items()
+    }, ("stat",)))
+
+@app.route('/metrics')
+def metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=0)"}), 404
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
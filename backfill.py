@@ -0,0 +1,193 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from APIwebScrapingPopUp import (
+    ALL_STATES, ALL_COMMODITIES, SCRAPE_WORKERS, get_commodity_code, get_state_code, price_store,
+    scrape_price_trends
+)
+
+logger = logging.getLogger("backfill")
+
+def parse_month(value):
+    try:
+        parsed = datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got '{value}'")
+    return parsed.year, parsed.month
+
+def parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def canonical_names(names, known):
+    # Match the spelling used by the refresh scheduler so backfilled slices share its store keys
+    by_lower = {name.lower(): name for name in known}
+    return [by_lower.get(name.lower(), name) for name in names]
+
+def month_range(start, end):
+    year, month = start
+    while (year, month) <= end:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def work_units(start, end, states, commodities):
+    return [(year, month, state, commodity)
+            for year, month in month_range(start, end)
+            for state in states
+            for commodity in commodities]
+
+class Checkpoint:
+    """Append-only JSONL record of completed work units, so a rerun skips them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            self.load()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        with open(self.path) as f:
+            lines = f.read().split("\n")
+        torn = False
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.done.add(tuple(json.loads(line)))
+            except ValueError:
+                # A crash mid-append leaves a partial last line; that unit simply reruns
+                if number < len(lines) - 1:
+                    raise ValueError(f"Corrupt checkpoint {self.path} at line {number}: {line!r}")
+                logger.warning(f"Ignoring torn final line in checkpoint {self.path}: {line!r}")
+                torn = True
+        if torn:
+            # Rewrite without the torn line so the next append does not glue onto it
+            temp = self.path + ".tmp"
+            with open(temp, 'w') as f:
+                for unit in sorted(self.done):
+                    f.write(json.dumps(list(unit)) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.path)
+
+    def mark(self, units):
+        with open(self.path, 'a') as f:
+            for unit in units:
+                f.write(json.dumps(list(unit)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(units)
+
+def scrape_unit(unit):
+    year, month, state, commodity = unit
+    return scrape_price_trends(state, commodity, None, year, month)
+
+class Progress:
+    def __init__(self, total, every):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+
+    def update(self, failed=False):
+        if failed:
+            self.failed += 1
+        else:
+            self.done += 1
+        now = time.monotonic()
+        if now - self.last_report >= self.every:
+            self.last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        finished = self.done + self.failed
+        rate = finished / elapsed * 60 if elapsed else 0.0
+        eta = (self.total - finished) / rate if rate else float('inf')
+        logger.info(f"Backfill progress: {finished}/{self.total} units ({self.failed} failed), "
+                    f"{rate:.1f} units/min, ETA {eta:.1f} min")
+
+def run_backfill(units, checkpoint, workers, batch_size, report_every):
+    pending = [unit for unit in units if unit not in checkpoint.done]
+    logger.info(f"Backfill: {len(units)} units, {len(units) - len(pending)} already done, {len(pending)} to run")
+    progress = Progress(len(pending), report_every)
+    batch = []
+
+    def flush():
+        if batch:
+            price_store.replace_slices([((state, commodity, year, month), records)
+                                        for (year, month, state, commodity), records in batch])
+            checkpoint.mark([unit for unit, _ in batch])
+            batch.clear()
+
+    remaining = iter(pending)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Keep at most a few units queued per worker so memory stays flat on multi-year ranges
+        in_flight = {}
+        for unit in remaining:
+            in_flight[executor.submit(scrape_unit, unit)] = unit
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                unit = in_flight.pop(future)
+                try:
+                    records = future.result()
+                except Exception as e:
+                    logger.warning(f"Backfill unit {unit} failed: {e}")
+                    progress.update(failed=True)
+                else:
+                    batch.append((unit, records))
+                    progress.update()
+                    if len(batch) >= batch_size:
+                        flush()
+                next_unit = next(remaining, None)
+                if next_unit is not None:
+                    in_flight[executor.submit(scrape_unit, next_unit)] = next_unit
+    flush()
+    progress.report()
+    return progress
+
+def main(argv=None):
+    today = datetime.now()
+    parser = argparse.ArgumentParser(description="Backfill historical agmarknet prices into the local store.")
+    parser.add_argument("--start", type=parse_month, required=True, help="First month, YYYY-MM")
+    parser.add_argument("--end", type=parse_month, default=(today.year, today.month),
+                        help="Last month, YYYY-MM (default: current month)")
+    parser.add_argument("--states", type=parse_list, default=ALL_STATES, help="Comma-separated states (default: all)")
+    parser.add_argument("--commodities", type=parse_list, default=ALL_COMMODITIES,
+                        help="Comma-separated commodities (default: all)")
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS, help="Concurrent scrapes")
+    parser.add_argument("--batch-size", type=int, default=50, help="Units written to the store per transaction")
+    parser.add_argument("--checkpoint", default=os.path.join("data", "backfill.checkpoint"),
+                        help="File recording completed units")
+    parser.add_argument("--report-every", type=float, default=30, help="Seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    if args.start > args.end:
+        parser.error("--start must not be after --end")
+    states = canonical_names(args.states, ALL_STATES)
+    commodities = canonical_names(args.commodities, ALL_COMMODITIES)
+    # An unknown name scrapes as an empty slice and would be checkpointed as done
+    unknown = ([f"state '{name}'" for name in states if not get_state_code(name)] +
+               [f"commodity '{name}'" for name in commodities if not get_commodity_code(name)])
+    if unknown:
+        parser.error(f"Unknown {', '.join(unknown)}")
+    units = work_units(args.start, args.end, states, commodities)
+    progress = run_backfill(units, Checkpoint(args.checkpoint), max(args.workers, 1),
+                            max(args.batch_size, 1), args.report_every)
+    return 1 if progress.failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
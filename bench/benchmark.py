@@ -0,0 +1,213 @@
+"""Offline scrape benchmarks against the local agmarknet stand-in.
+
+    python -m bench.benchmark --rows 40 --latency 0.05 --json bench_results.json
+    python -m bench.benchmark --baseline bench_results.json
+
+Reports records/s, p50/p95/p99 per-scrape latency, full-sweep wall time and peak RSS for
+get_data_from_price_trends and /all-data. Each scenario runs in its own subprocess, so its
+peak RSS is not inflated by the scenarios before it. With --baseline, exits non-zero when a
+metric regresses by more than --tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.stand_in_server import start_in_background
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics where a higher value is a regression; the rest regress when they drop
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "wall_s", "peak_rss_mb")
+
+# Run in this order; fill_store only loads the store for the two scenarios after it
+SCENARIOS = ("get_data_from_price_trends", "sweep", "all_data_live", "fill_store",
+             "all_data_store", "all_data_ndjson")
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def latency_summary(latencies, records, wall):
+    return {
+        "scrapes": len(latencies),
+        "records": records,
+        "records_per_s": round(records / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def bench_single_scrape(app_module, iterations):
+    states = app_module.ALL_STATES
+    commodities = app_module.ALL_COMMODITIES
+    latencies = []
+    records = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        state = states[i % len(states)]
+        commodity = commodities[(i // len(states)) % len(commodities)]
+        t = time.perf_counter()
+        records += len(app_module.get_data_from_price_trends(state, commodity, None))
+        latencies.append(time.perf_counter() - t)
+    return latency_summary(latencies, records, time.perf_counter() - started)
+
+def bench_sweep(app_module, jobs):
+    latencies = []
+    scrape_job = app_module.scrape_job
+
+    def timed_job(*args):
+        started = time.perf_counter()
+        try:
+            return scrape_job(*args)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    # run_sweep looks scrape_job up when it submits, so each worker times its own scrape
+    app_module.scrape_job = timed_job
+    records = 0
+    started = time.perf_counter()
+    try:
+        for _, job_records, _ in app_module.run_sweep(jobs):
+            records += len(job_records)
+    finally:
+        app_module.scrape_job = scrape_job
+    return latency_summary(latencies, records, time.perf_counter() - started)
+
+def bench_all_data(app_module, path):
+    client = app_module.app.test_client()
+    started = time.perf_counter()
+    response = client.get(path, buffered=True)
+    wall = time.perf_counter() - started
+    body = response.get_data()
+    if "format=ndjson" in path:
+        records = sum(1 for line in body.splitlines() if b'"Status"' not in line)
+    else:
+        payload = json.loads(body)
+        records = len(payload) if isinstance(payload, list) else 0
+    return {
+        "status": response.status_code,
+        "records": records,
+        "records_per_s": round(records / wall, 1) if wall else 0.0,
+        "wall_s": round(wall, 3),
+        "response_mb": round(len(body) / (1024 * 1024), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def run_scenario(name, args):
+    logging.disable(logging.WARNING)
+    import APIwebScrapingPopUp as app_module
+
+    states = app_module.ALL_STATES[:args.states] if args.states else app_module.ALL_STATES
+    jobs = [(state, commodity) for state in states for commodity in app_module.ALL_COMMODITIES]
+    if name == "get_data_from_price_trends":
+        return bench_single_scrape(app_module, args.iterations)
+    if name == "sweep":
+        return bench_sweep(app_module, jobs)
+    if name == "all_data_live":
+        return bench_all_data(app_module, "/all-data?source=live")
+    if name == "fill_store":
+        app_module.refresh_slices(jobs)
+        return {}
+    if name == "all_data_store":
+        return bench_all_data(app_module, "/all-data")
+    return bench_all_data(app_module, "/all-data?format=ndjson")
+
+def run_isolated(name, args):
+    """Run one scenario in a fresh interpreter and return its result."""
+    command = [sys.executable, "-m", "bench.benchmark", "--scenario", name,
+               "--iterations", str(args.iterations), "--states", str(args.states)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run(command, env=env, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if not isinstance(base, (int, float)) or not base or metric in ("scrapes", "records", "status"):
+                continue
+            change = (value - base) / base
+            if metric in LOWER_IS_BETTER and change > tolerance:
+                regressions.append(f"{name}.{metric}: {base} -> {value} (+{change:.0%})")
+            elif metric not in LOWER_IS_BETTER and metric.endswith("per_s") and change < -tolerance:
+                regressions.append(f"{name}.{metric}: {base} -> {value} ({change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local agmarknet stand-in.")
+    parser.add_argument("--rows", type=int, default=40, help="Table rows per stand-in postback")
+    parser.add_argument("--viewstate-kb", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Injected mean upstream latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--iterations", type=int, default=50, help="Sequential get_data_from_price_trends calls")
+    parser.add_argument("--states", type=int, default=0, help="Limit the sweep to the first N states (0 = all)")
+    parser.add_argument("--url", help="Benchmark an already running stand-in instead of starting one")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--scenario", choices=SCENARIOS,
+                        help="Run only this scenario in-process and print its result as JSON (used by the runner)")
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario, args)))
+        return 0
+
+    if args.url:
+        url = args.url
+    else:
+        _, url = start_in_background(port=0, rows=args.rows, viewstate_kb=args.viewstate_kb,
+                                     latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    # The scenario subprocesses inherit these. The app reads its settings at import: point it at
+    # the stand-in, lift the politeness limits that only make sense against the live site, and
+    # keep caches out of the numbers.
+    os.environ["AGMARKNET_URL"] = url
+    os.environ.setdefault("SCRAPE_RATE", "10000")
+    os.environ.setdefault("SCRAPE_BURST", "10000")
+    os.environ.setdefault("SCRAPE_CACHE_SIZE", "0")
+    os.environ.setdefault("REFRESH_INTERVAL", "0")
+    os.environ.setdefault("PRICE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="agmarknet-bench-"), "prices.db"))
+
+    results = {}
+    for name in SCENARIOS:
+        result = run_isolated(name, args)
+        if result:
+            results[name] = result
+
+    for name, metrics in results.items():
+        print(f"{name:28s} " + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
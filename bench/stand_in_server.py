@@ -0,0 +1,215 @@
+"""Local stand-in for agmarknet's SA_Month_PriMV.aspx.
+
+Serves the hidden-field GET and the postback POST so the scraper can be exercised and
+benchmarked offline. Run it and point the app at it with
+AGMARKNET_URL=http://127.0.0.1:8765/PriceTrends/SA_Month_PriMV.aspx
+"""
+import argparse
+import base64
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+PAGE = """<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title>Agmarknet - Price Trends</title></head>
+<body>
+<form method="post" action="./SA_Month_PriMV.aspx" id="form1">
+<div class="aspNetHidden">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+</div>
+<div class="aspNetHidden">
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="{generator}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{eventvalidation}" />
+</div>
+<select name="ctl00$cphBody$cboYear" id="cphBody_cboYear">{year_options}</select>
+<select name="ctl00$cphBody$cboMonth" id="cphBody_cboMonth">{month_options}</select>
+<select name="ctl00$cphBody$cboState" id="cphBody_cboState">{state_options}</select>
+<select name="ctl00$cphBody$cboCommodity" id="cphBody_cboCommodity">{commodity_options}</select>
+<input type="submit" name="ctl00$cphBody$btnSubmit" value="Submit" id="cphBody_btnSubmit" />
+{table}
+</form>
+</body>
+</html>"""
+
+TABLE = """<div>
+<table class="tableagmark_new" cellspacing="0" rules="all" border="1" id="cphBody_gridRecords" style="border-collapse:collapse;">
+<tr><th scope="col">Market Name</th><th scope="col">Variety</th><th scope="col">Min Price (Rs./Quintal)</th><th scope="col">Max Price (Rs./Quintal)</th><th scope="col">Modal Price (Rs./Quintal)</th><th scope="col">Price Date</th></tr>
+{rows}
+</table>
+</div>"""
+
+ROW = ("<tr><td><span>{market}</span></td><td>{variety}</td><td>{min_price}</td>"
+       "<td>{max_price}</td><td>{modal_price}</td><td>{date}</td></tr>")
+
+VIEWSTATE_ERROR = ("<html><body><h1>Server Error in '/' Application.</h1>"
+                   "<h2><i>Validation of viewstate MAC failed.</i></h2></body></html>")
+
+VARIETIES = ["Local", "Hybrid", "Other", "FAQ", "Desi"]
+
+def options(values, selected=None):
+    return "".join(
+        f'<option selected="selected" value="{value}">{value}</option>' if value == selected
+        else f'<option value="{value}">{value}</option>'
+        for value in values
+    )
+
+class StandInState:
+    def __init__(self, rows, viewstate_kb, latency, jitter, error_rate, empty_rate, seed, stale_error=False):
+        self.rows = rows
+        self.stale_error = stale_error
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        blob = hashlib.sha256(str(seed).encode()).digest() * (viewstate_kb * 1024 // 32 + 1)
+        self.viewstate = base64.b64encode(blob[:viewstate_kb * 1024]).decode()
+        self.generator = "A1B2C3D4"
+        self.eventvalidation = base64.b64encode(hashlib.sha256(self.viewstate.encode()).digest()).decode()
+        self.fixture = None
+        self.counters = {"get": 0, "post": 0, "rejected": 0, "errors": 0}
+        self.counters_lock = threading.Lock()
+
+    def roll(self):
+        with self.random_lock:
+            return self.random.random()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self.random_lock:
+                wait = max(0.0, self.random.gauss(self.latency, self.jitter))
+            time.sleep(wait)
+
+    def count(self, name):
+        with self.counters_lock:
+            self.counters[name] += 1
+
+    def table(self, year, month, state, commodity):
+        rng = random.Random(f"{year}-{month}-{state}-{commodity}")
+        rows = []
+        for i in range(self.rows):
+            modal = rng.randint(500, 6000)
+            rows.append(ROW.format(
+                market=f"Market {state}-{i:03d}", variety=VARIETIES[i % len(VARIETIES)],
+                min_price=modal - rng.randint(0, 400), max_price=modal + rng.randint(0, 400),
+                modal_price=modal, date=f"{rng.randint(1, 28):02d}-{month:0>2}-{year}"
+            ))
+        return TABLE.format(rows="\n".join(rows))
+
+    def page(self, fields=None, table=""):
+        fields = fields or {}
+        return PAGE.format(
+            viewstate=self.viewstate, generator=self.generator, eventvalidation=self.eventvalidation,
+            year_options=options([str(y) for y in range(2015, 2031)], fields.get('year')),
+            month_options=options([str(m) for m in range(1, 13)], fields.get('month')),
+            state_options=options([f"{s:02d}" for s in range(1, 37)], fields.get('state')),
+            commodity_options=options([str(c) for c in range(1, 80)], fields.get('commodity')),
+            table=table
+        )
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_page(self, body, status=200):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def maybe_fail(self):
+        if self.state.error_rate and self.state.roll() < self.state.error_rate:
+            self.state.count("errors")
+            self.send_page("<html><body>Server Error in '/' Application.</body></html>", 500)
+            return True
+        return False
+
+    def do_GET(self):
+        self.state.count("get")
+        self.state.delay()
+        if not self.maybe_fail():
+            self.send_page(self.state.page())
+
+    def do_POST(self):
+        self.state.count("post")
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        self.state.delay()
+        if self.maybe_fail():
+            return
+        if form.get("__VIEWSTATE") != self.state.viewstate or form.get("__EVENTVALIDATION") != self.state.eventvalidation:
+            # Like ASP.NET with a stale token: either render the blank form without any
+            # selection or fail viewstate MAC validation with a 500
+            self.state.count("rejected")
+            if self.state.stale_error:
+                self.send_page(VIEWSTATE_ERROR, 500)
+            else:
+                self.send_page(self.state.page())
+            return
+        fields = {
+            'year': form.get("ctl00$cphBody$cboYear"), 'month': form.get("ctl00$cphBody$cboMonth"),
+            'state': form.get("ctl00$cphBody$cboState"), 'commodity': form.get("ctl00$cphBody$cboCommodity")
+        }
+        if self.state.fixture is not None:
+            table = self.state.fixture
+        elif self.state.empty_rate and self.state.roll() < self.state.empty_rate:
+            table = "<span>No Data Found</span>"
+        else:
+            table = self.state.table(fields['year'], fields['month'], fields['state'], fields['commodity'])
+        self.send_page(self.state.page(fields, table))
+
+def make_server(host="127.0.0.1", port=8765, rows=40, viewstate_kb=200, latency=0.0, jitter=0.0,
+                error_rate=0.0, empty_rate=0.0, seed=0, fixture=None, stale_error=False):
+    """Build (but do not start) a stand-in server; port 0 picks a free port."""
+    state = StandInState(rows, viewstate_kb, latency, jitter, error_rate, empty_rate, seed, stale_error)
+    if fixture:
+        with open(fixture, encoding="utf-8") as f:
+            state.fixture = f.read()
+    handler = type("BoundStandInHandler", (StandInHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stand_in = state
+    return server
+
+def start_in_background(**kwargs):
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name="stand-in-server", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/PriceTrends/SA_Month_PriMV.aspx"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline stand-in for agmarknet's SA_Month_PriMV.aspx.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=40, help="Table rows per postback")
+    parser.add_argument("--viewstate-kb", type=int, default=200, help="Size of the __VIEWSTATE blob")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean injected latency per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Std-dev of injected latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Fraction of postbacks with no data table")
+    parser.add_argument("--fixture", help="Saved HTML table to return for every postback instead of generated rows")
+    parser.add_argument("--stale-error", action="store_true",
+                        help="Answer stale form tokens with a viewstate MAC 500 instead of the blank form")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.rows, args.viewstate_kb, args.latency, args.jitter,
+                         args.error_rate, args.empty_rate, args.seed, args.fixture, args.stale_error)
+    print(f"Serving stand-in on http://{args.host}:{server.server_address[1]}/PriceTrends/SA_Month_PriMV.aspx")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+class Gauge:
+    """Gauge whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name, help, collect, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self.series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                bucket_labels = _labels(self.label_names, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class TraceLog:
+    """Appends one JSON object per line to a file; safe to share between threads."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', buffering=1, encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def write(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class NullTrace:
+    """Stand-in used when instrumentation is disabled; every hook is a no-op."""
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def finish(self, outcome, records=0, error=None):
+        pass
+
+NULL_TRACE = NullTrace()
+
+class _Stage:
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.trace.record(self.name, elapsed, "ok" if exc_type is None else "error", exc)
+        return False
+
+class ScrapeTrace:
+    """Times the stages of one scrape and reports them to the stage histogram and trace log."""
+
+    def __init__(self, instrumentation, state, commodity, **context):
+        self.instrumentation = instrumentation
+        self.state = state
+        self.commodity = commodity
+        self.context = context
+        self.started = time.perf_counter()
+        self.stages = []
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, elapsed, outcome, error=None):
+        self.instrumentation.record(name, elapsed, outcome, error)
+        self.instrumentation.slice_stage_seconds.inc(self.state, self.commodity, name, amount=elapsed)
+        if self.instrumentation.trace_log is not None:
+            self.stages.append({"stage": name, "seconds": round(elapsed, 6), "outcome": outcome})
+
+    def finish(self, outcome, records=0, error=None):
+        elapsed = time.perf_counter() - self.started
+        instrumentation = self.instrumentation
+        instrumentation.scrapes.inc(self.state, self.commodity, outcome)
+        instrumentation.scrape_seconds.observe(elapsed, outcome)
+        if instrumentation.trace_log is not None:
+            instrumentation.trace_log.write({
+                "ts": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                "state": self.state, "commodity": self.commodity, **self.context,
+                "outcome": outcome, "records": records, "seconds": round(elapsed, 6),
+                "stages": self.stages,
+                "error": f"{type(error).__name__}: {error}" if error is not None else None
+            })
+
+class Instrumentation:
+    def __init__(self, enabled, trace_log_path=None):
+        self.enabled = enabled
+        self.registry = Registry()
+        self.trace_log = TraceLog(trace_log_path) if enabled and trace_log_path else None
+        self.stage_seconds = self.registry.register(Histogram(
+            "agmarknet_stage_seconds", "Time spent per scrape/request stage", ("stage", "outcome")))
+        self.scrape_seconds = self.registry.register(Histogram(
+            "agmarknet_scrape_seconds", "End-to-end time per (state, commodity) scrape", ("outcome",)))
+        # Per-slice totals are plain counters: a histogram per (state, commodity, stage) would explode cardinality
+        self.slice_stage_seconds = self.registry.register(Counter(
+            "agmarknet_slice_stage_seconds_total", "Cumulative stage time by state and commodity",
+            ("state", "commodity", "stage")))
+        self.scrapes = self.registry.register(Counter(
+            "agmarknet_scrapes_total", "Scrapes by state, commodity and outcome", ("state", "commodity", "outcome")))
+        self.errors = self.registry.register(Counter(
+            "agmarknet_stage_errors_total", "Stage failures by exception type", ("stage", "error")))
+
+    def trace(self, state, commodity, **context):
+        if not self.enabled:
+            return NULL_TRACE
+        return ScrapeTrace(self, state, commodity, **context)
+
+    def time_stage(self, name):
+        """Time a stage that is not part of a single scrape, e.g. response serialization."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, elapsed, outcome, error=None):
+        if not self.enabled:
+            return
+        self.stage_seconds.observe(elapsed, name, outcome)
+        if error is not None:
+            self.errors.inc(name, type(error).__name__)
+
+    def render(self):
+        return self.registry.render()
@@ -0,0 +1,119 @@
+from html.parser import HTMLParser
+
+FORM_TOKEN_FIELDS = ('__VIEWSTATE', '__VIEWSTATEGENERATOR', '__EVENTVALIDATION')
+# In order of preference: a page carrying both tables is read from cphBody_gridRecords
+PRICE_TABLE_IDS = ('cphBody_gridRecords', 'gvReportData')
+
+class _StopParsing(Exception):
+    pass
+
+class _FormTokenParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tokens = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'input':
+            return
+        attrs = dict(attrs)
+        name = attrs.get('name')
+        if name in FORM_TOKEN_FIELDS:
+            self.tokens[name] = attrs.get('value') or ''
+            if len(self.tokens) == len(FORM_TOKEN_FIELDS):
+                raise _StopParsing()
+
+class _PriceTableParser(HTMLParser):
+    """Collects the <td> texts of each row of the price table, then stops.
+
+    Like a browser, an unclosed <td> ends at the next <td> or </tr>. Only the price table's
+    own rows and cells are collected; the text of a table nested inside a cell becomes part
+    of that cell, so the market / price columns never shift.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.table_id = None
+        self.table_depth = 0
+        self.rows = []
+        self.row = None
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self.table_depth:
+                self.table_depth += 1
+                return
+            table_id = dict(attrs).get('id')
+            if self.preferred(table_id):
+                self.table_id = table_id
+                self.rows = []
+                self.table_depth = 1
+            return
+        if self.table_depth != 1:
+            return
+        if tag == 'tr':
+            self.end_row()
+            self.row = []
+        elif tag == 'td' and self.row is not None:
+            self.end_cell()
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if not self.table_depth:
+            return
+        if tag == 'table':
+            self.table_depth -= 1
+            if not self.table_depth:
+                self.end_row()
+                if self.table_id == PRICE_TABLE_IDS[0]:
+                    raise _StopParsing()
+        elif self.table_depth != 1:
+            return
+        elif tag == 'td':
+            self.end_cell()
+        elif tag == 'tr':
+            self.end_row()
+
+    def preferred(self, table_id):
+        if table_id not in PRICE_TABLE_IDS:
+            return False
+        return self.table_id is None or PRICE_TABLE_IDS.index(table_id) < PRICE_TABLE_IDS.index(self.table_id)
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+    def end_cell(self):
+        if self.cell is not None:
+            self.row.append(''.join(self.cell).strip())
+            self.cell = None
+
+    def end_row(self):
+        if self.row is not None:
+            self.end_cell()
+            self.rows.append(tuple(self.row))
+            self.row = None
+
+def _run(parser, html):
+    try:
+        parser.feed(html)
+        parser.close()
+    except _StopParsing:
+        pass
+    return parser
+
+def extract_form_tokens(html):
+    """Return the ASP.NET hidden form tokens, raising ValueError if any is missing."""
+    tokens = _run(_FormTokenParser(), html).tokens
+    missing = [name for name in FORM_TOKEN_FIELDS if name not in tokens]
+    if missing:
+        raise ValueError(f"Form tokens missing from page: {', '.join(missing)}")
+    return tokens
+
+def extract_price_rows(html):
+    """Return the price table's rows (header included) as tuples of cell text, or None if there is no table."""
+    parser = _run(_PriceTableParser(), html)
+    if parser.table_depth:
+        # Truncated page: keep the row that was still open
+        parser.end_row()
+    return parser.rows if parser.table_id is not None else None
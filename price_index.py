@@ -0,0 +1,119 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right
+
+FILTER_FIELDS = {"state": "State", "commodity": "Commodity", "market": "Market", "variety": "Variety"}
+SORT_FIELDS = {
+    "modal_price": "Modal Price", "min_price": "Min Price", "max_price": "Max Price",
+    "state": "State", "commodity": "Commodity", "market": "Market", "variety": "Variety"
+}
+NUMERIC_SORT_FIELDS = {"modal_price", "min_price", "max_price"}
+
+class QueryError(ValueError):
+    pass
+
+def parse_price(value):
+    try:
+        return float(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return None
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def _as_tuple(value):
+    return tuple(_as_tuple(item) for item in value) if isinstance(value, list) else value
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = _as_tuple(json.loads(base64.urlsafe_b64decode(padded.encode())))
+        sort_value, natural_key = key
+        if not isinstance(sort_value, tuple) or not isinstance(natural_key, tuple):
+            raise ValueError(cursor)
+        # The key is bisected against sort_key() tuples, so every element must compare with them
+        rank, value = sort_value
+        if type(rank) is not int or type(value) not in (int, float, str):
+            raise ValueError(cursor)
+        if len(natural_key) != 4 or not all(isinstance(part, str) for part in natural_key):
+            raise ValueError(cursor)
+        return key
+    except (ValueError, TypeError):
+        raise QueryError("Invalid cursor")
+
+class PriceIndex:
+    """Immutable in-memory index over one month of price records.
+
+    Keeps a posting set per (field, lower-cased value) and a modal-price-sorted array,
+    so a query only touches the records that match its filters.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.postings = {field: {} for field in FILTER_FIELDS}
+        for i, record in enumerate(self.records):
+            for field, column in FILTER_FIELDS.items():
+                value = (record.get(column) or '').lower()
+                self.postings[field].setdefault(value, set()).add(i)
+        priced = sorted((price, i) for i, price in
+                        ((i, parse_price(r.get("Modal Price"))) for i, r in enumerate(self.records))
+                        if price is not None)
+        self.modal_prices = [price for price, _ in priced]
+        self.modal_ids = [i for _, i in priced]
+
+    def natural_key(self, i):
+        record = self.records[i]
+        return (record.get("State") or '', record.get("Commodity") or '',
+                record.get("Market") or '', record.get("Variety") or '')
+
+    def sort_key(self, i, field):
+        value = self.records[i].get(SORT_FIELDS[field])
+        if field in NUMERIC_SORT_FIELDS:
+            price = parse_price(value)
+            # Records without a parseable price sort after every priced record
+            return ((0, price) if price is not None else (1, 0.0)), self.natural_key(i)
+        return (0, (value or '').lower()), self.natural_key(i)
+
+    def match(self, filters, min_modal=None, max_modal=None):
+        candidates = []
+        for field, values in filters.items():
+            postings = self.postings[field]
+            ids = set()
+            for value in values:
+                ids |= postings.get(value.lower(), set())
+            candidates.append(ids)
+        if min_modal is not None or max_modal is not None:
+            lo = bisect_left(self.modal_prices, min_modal) if min_modal is not None else 0
+            hi = bisect_right(self.modal_prices, max_modal) if max_modal is not None else len(self.modal_prices)
+            candidates.append(set(self.modal_ids[lo:hi]))
+        if not candidates:
+            return range(len(self.records))
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for ids in candidates[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def query(self, filters, min_modal=None, max_modal=None, sort="modal_price", descending=False,
+              limit=100, cursor=None):
+        """Return (records, total matches, next cursor) for one page of results."""
+        if sort not in SORT_FIELDS:
+            raise QueryError(f"Cannot sort by '{sort}'")
+        ids = self.match(filters, min_modal, max_modal)
+        keyed = sorted((self.sort_key(i, sort), i) for i in ids)
+        keys = [key for key, _ in keyed]
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and keys and type(after[0][1]) is not type(keys[0][0][1]):
+            raise QueryError("Cursor does not match the requested sort")
+        if descending:
+            end = bisect_left(keys, after) if after else len(keyed)
+            page = keyed[max(end - limit, 0):end][::-1]
+            has_more = end - limit > 0
+        else:
+            start = bisect_right(keys, after) if after else 0
+            page = keyed[start:start + limit]
+            has_more = start + limit < len(keyed)
+        next_cursor = encode_cursor(page[-1][0]) if page and has_more else None
+        return [self.records[i] for _, i in page], len(keyed), next_cursor
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    state TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    market TEXT NOT NULL,
+    variety TEXT NOT NULL,
+    s_no INTEGER NOT NULL,
+    min_price TEXT,
+    max_price TEXT,
+    modal_price TEXT,
+    PRIMARY KEY (state, commodity, year, month, market, variety)
+);
+CREATE TABLE IF NOT EXISTS slices (
+    state TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    refreshed_at REAL NOT NULL,
+    record_count INTEGER NOT NULL,
+    PRIMARY KEY (state, commodity, year, month)
+);
+"""
+
+def record_to_row(state, commodity, year, month, s_no, record):
+    return (state, commodity, year, month, record["Market"], record["Variety"], s_no,
+            record["Min Price"], record["Max Price"], record["Modal Price"])
+
+def row_to_record(row):
+    state, commodity, year, month, market, variety, s_no, min_price, max_price, modal_price, refreshed_at = row
+    return {
+        "S.No": str(s_no),
+        "Date": f"{month}/{year}",
+        "State": state,
+        "Market": market,
+        "Commodity": commodity,
+        "Variety": variety,
+        "Min Price": min_price,
+        "Max Price": max_price,
+        "Modal Price": modal_price,
+        "Refreshed At": format_timestamp(refreshed_at)
+    }
+
+def format_timestamp(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+class PriceStore:
+    """SQLite (WAL) store of scraped price records, one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.local = threading.local()
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def replace_slices(self, slices, refreshed_at=None):
+        """Atomically replace the records of several (state, commodity, year, month) slices."""
+        refreshed_at = refreshed_at or time.time()
+        conn = self.connection()
+        with conn:
+            for (state, commodity, year, month), records in slices:
+                conn.execute("DELETE FROM prices WHERE state=? AND commodity=? AND year=? AND month=?",
+                             (state, commodity, year, month))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [record_to_row(state, commodity, year, month, i, record) for i, record in enumerate(records, 1)]
+                )
+                conn.execute("INSERT OR REPLACE INTO slices VALUES (?, ?, ?, ?, ?, ?)",
+                             (state, commodity, year, month, refreshed_at, len(records)))
+
+    def replace_slice(self, state, commodity, year, month, records, refreshed_at=None):
+        self.replace_slices([((state, commodity, year, month), records)], refreshed_at)
+
+    def slice_freshness(self, year, month):
+        rows = self.connection().execute(
+            "SELECT state, commodity, refreshed_at FROM slices WHERE year=? AND month=?", (year, month)
+        )
+        return {(state, commodity): refreshed_at for state, commodity, refreshed_at in rows}
+
+    def generation(self, year, month):
+        """Cheap change marker for a month: (slice count, latest refresh time)."""
+        return self.connection().execute(
+            "SELECT COUNT(*), MAX(refreshed_at) FROM slices WHERE year=? AND month=?", (year, month)
+        ).fetchone()
+
+    def stale_pairs(self, pairs, year, month, max_age):
+        """Return the pairs never fetched for the month or older than max_age seconds, oldest first."""
+        freshness = self.slice_freshness(year, month)
+        cutoff = time.time() - max_age
+        stale = [pair for pair in pairs if freshness.get(pair, 0) < cutoff]
+        return sorted(stale, key=lambda pair: freshness.get(pair, 0))
+
+    def empty_slices(self, year, month):
+        """(state, commodity) pairs fetched for the month that had no records, in iter_records order."""
+        rows = self.connection().execute(
+            "SELECT state, commodity FROM slices WHERE year=? AND month=? AND record_count=0 "
+            "ORDER BY state, commodity", (year, month)
+        )
+        return [(state, commodity) for state, commodity in rows]
+
+    def iter_records(self, year, month):
+        cursor = self.connection().execute(
+            "SELECT p.state, p.commodity, p.year, p.month, p.market, p.variety, p.s_no, "
+            "p.min_price, p.max_price, p.modal_price, s.refreshed_at "
+            "FROM prices p JOIN slices s USING (state, commodity, year, month) "
+            "WHERE p.year=? AND p.month=? ORDER BY p.state, p.commodity, p.s_no",
+            (year, month)
+        )
+        for row in cursor:
+            yield row_to_record(row)
+
+class RefreshScheduler(threading.Thread):
+    """Background thread that re-scrapes stale (state, commodity) pairs into the store."""
+
+    def __init__(self, store, pairs, refresh, interval, max_age, batch_size):
+        super().__init__(name="price-refresh", daemon=True)
+        self.store = store
+        self.pairs = pairs
+        self.refresh = refresh
+        self.interval = interval
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Background refresh failed: {e}")
+            self.stopped.wait(self.interval)
+
+    def tick(self):
+        today = time.localtime()
+        stale = self.store.stale_pairs(self.pairs, today.tm_year, today.tm_mon, self.max_age)
+        if not stale:
+            return
+        batch = stale[:self.batch_size]
+        logger.info(f"Refreshing {len(batch)} of {len(stale)} stale slices")
+        self.refresh(batch)
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,95 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class ScrapeCache:
+    """Bounded LRU + TTL cache with single-flight fetches and stale-while-revalidate.
+
+    Entries younger than ttl are served as hits. Entries up to ttl + stale_ttl old are
+    served immediately while one background fetch refreshes them. Concurrent misses for
+    the same key wait on a single in-flight fetch instead of each calling upstream.
+    """
+
+    def __init__(self, max_size, ttl, stale_ttl, revalidate_workers=2):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.revalidator = ThreadPoolExecutor(max_workers=revalidate_workers, thread_name_prefix="cache-revalidate")
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "stale_hits": 0,
+                         "revalidations": 0, "evictions": 0, "errors": 0}
+
+    def get(self, key, fetch, allow_stale=True):
+        if self.max_size <= 0:
+            return fetch()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.monotonic() - stored_at
+                if age < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return value
+                if allow_stale and age < self.ttl + self.stale_ttl:
+                    self.entries.move_to_end(key)
+                    self.counters["stale_hits"] += 1
+                    if key not in self.in_flight:
+                        self.in_flight[key] = _InFlight()
+                        self.counters["revalidations"] += 1
+                        self.revalidator.submit(self._fetch, key, fetch, self.in_flight[key])
+                    return value
+            flight = self.in_flight.get(key)
+            if flight is None:
+                flight = self.in_flight[key] = _InFlight()
+                self.counters["misses"] += 1
+                leader = True
+            else:
+                self.counters["coalesced"] += 1
+                leader = False
+        if leader:
+            self._fetch(key, fetch, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _fetch(self, key, fetch, flight):
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+        with self.lock:
+            if flight.error is None:
+                self.entries[key] = (flight.value, time.monotonic())
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.counters["evictions"] += 1
+            else:
+                self.counters["errors"] += 1
+                logger.debug(f"Cache fetch for {key} failed: {flight.error}")
+            del self.in_flight[key]
+        flight.done.set()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats.update({"size": len(self.entries), "max_size": self.max_size,
+                          "in_flight": len(self.in_flight)})
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,11 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Test modules that import the app (directly or via backfill) need it to open its price
+# store somewhere disposable and not start the background refresh thread
+_DATA_DIR = tempfile.mkdtemp(prefix="agmarknet-tests-")
+atexit.register(shutil.rmtree, _DATA_DIR, ignore_errors=True)
+os.environ.setdefault("PRICE_DB_PATH", os.path.join(_DATA_DIR, "prices.db"))
+os.environ.setdefault("REFRESH_INTERVAL", "0")
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+
+import backfill
+from backfill import Checkpoint
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "backfill.checkpoint")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_torn_final_line_is_skipped_and_rewritten(self):
+        self.write('[2024, 1, "Goa", "Rice"]\n[2024, 2, "Go')
+        with self.assertLogs("backfill", "WARNING"):
+            checkpoint = Checkpoint(self.path)
+        self.assertEqual(checkpoint.done, {(2024, 1, "Goa", "Rice")})
+        self.assertEqual(self.read(), '[2024, 1, "Goa", "Rice"]\n')
+        checkpoint.mark([(2024, 2, "Goa", "Rice")])
+        self.assertEqual(Checkpoint(self.path).done, {(2024, 1, "Goa", "Rice"), (2024, 2, "Goa", "Rice")})
+
+    def test_corrupt_line_before_the_end_raises(self):
+        self.write('[2024, 1, "Goa", "Rice"]\ngarbage\n[2024, 3, "Goa", "Rice"]\n')
+        with self.assertRaises(ValueError):
+            Checkpoint(self.path)
+        self.assertIn("garbage", self.read())
+
+    def test_missing_file_starts_empty(self):
+        self.assertEqual(Checkpoint(self.path).done, set())
+
+class MainTest(unittest.TestCase):
+    def test_unknown_names_are_rejected(self):
+        stderr = StringIO()
+        with redirect_stderr(stderr), self.assertRaises(SystemExit) as raised:
+            backfill.main(["--start", "2024-01", "--end", "2024-01",
+                           "--states", "Karnatka,goa", "--commodities", "rice,Ryce"])
+        self.assertEqual(raised.exception.code, 2)
+        self.assertIn("state 'Karnatka'", stderr.getvalue())
+        self.assertIn("commodity 'Ryce'", stderr.getvalue())
+        self.assertNotIn("'goa'", stderr.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Parity of page_parser with the BeautifulSoup extraction it replaced."""
+import os
+import unittest
+
+from bs4 import BeautifulSoup
+
+from page_parser import FORM_TOKEN_FIELDS, extract_form_tokens, extract_price_rows
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = ("price_trends_grid_records.html", "price_trends_report_data.html", "price_trends_no_data.html")
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def soup_price_rows(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find('table', {'id': 'cphBody_gridRecords'}) or soup.find('table', {'id': 'gvReportData'})
+    if not table:
+        return None
+    return [tuple(cell.text.strip() for cell in row.find_all('td')) for row in table.find_all('tr')]
+
+def soup_form_tokens(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return {name: soup.find('input', {'name': name})['value'] for name in FORM_TOKEN_FIELDS}
+
+class SavedPageParityTest(unittest.TestCase):
+    def test_price_rows_match_beautifulsoup(self):
+        for name in PAGES:
+            with self.subTest(page=name):
+                html = load(name)
+                self.assertEqual(extract_price_rows(html), soup_price_rows(html))
+
+    def test_form_tokens_match_beautifulsoup(self):
+        for name in PAGES:
+            with self.subTest(page=name):
+                html = load(name)
+                self.assertEqual(extract_form_tokens(html), soup_form_tokens(html))
+
+    def test_grid_records_rows(self):
+        rows = extract_price_rows(load("price_trends_grid_records.html"))
+        self.assertEqual(rows[0], ())
+        self.assertEqual(rows[2], ("Kottayam & Pala", "Other", "2,100", "2,450", "2,300", "05-Mar-2024"))
+        self.assertEqual(rows[3][2], "")
+        self.assertEqual(rows[4][:2], ("North\xa0Paravur", "Hybrid"))
+        self.assertEqual(rows[5], ("Note: prices in Rs./Quintal",))
+
+    def test_missing_table_and_tokens(self):
+        self.assertIsNone(extract_price_rows(load("price_trends_no_data.html")))
+        with self.assertRaises(ValueError):
+            extract_form_tokens("<form><input name='__VIEWSTATE' value='x' /></form>")
+
+class EdgeCaseTest(unittest.TestCase):
+    """Malformed markup where the streaming parser deliberately differs from BeautifulSoup."""
+
+    HEADER = "<tr><th>Market</th></tr>"
+
+    def test_prefers_grid_records_over_report_data(self):
+        html = ('<table id="gvReportData"><tr><td>legacy</td></tr></table>'
+                '<table id="cphBody_gridRecords"><tr><td>current</td></tr></table>')
+        self.assertEqual(extract_price_rows(html), [("current",)])
+        self.assertEqual(extract_price_rows(html), soup_price_rows(html))
+
+    def test_report_data_used_when_alone(self):
+        html = '<table id="gvReportData"><tr><td>legacy</td></tr></table><table id="other"><tr><td>x</td></tr></table>'
+        self.assertEqual(extract_price_rows(html), [("legacy",)])
+
+    def test_unclosed_cells_end_at_next_cell(self):
+        # html.parser-backed BeautifulSoup nests each unclosed <td> in the previous one,
+        # giving ('ab1', 'b1', '1'); browsers and page_parser close them instead.
+        html = f'<table id="cphBody_gridRecords">{self.HEADER}<tr><td>a<td>b<td>1</tr></table>'
+        self.assertEqual(extract_price_rows(html), [(), ("a", "b", "1")])
+        self.assertNotEqual(extract_price_rows(html), soup_price_rows(html))
+
+    def test_nested_table_stays_inside_its_cell(self):
+        # BeautifulSoup's recursive find_all also returns the nested table's cells and rows,
+        # shifting the price columns; page_parser keeps the outer row's shape.
+        html = (f'<table id="cphBody_gridRecords">{self.HEADER}'
+                '<tr><td>Aluva<table><tr><td>(new)</td></tr></table></td><td>Local</td></tr></table>')
+        self.assertEqual(extract_price_rows(html), [(), ("Aluva(new)", "Local")])
+        self.assertNotEqual(extract_price_rows(html), soup_price_rows(html))
+
+    def test_truncated_page_keeps_open_row(self):
+        html = f'<table id="cphBody_gridRecords">{self.HEADER}<tr><td>Aluva</td><td>Local'
+        self.assertEqual(extract_price_rows(html), [(), ("Aluva", "Local")])
+        self.assertEqual(extract_price_rows(html), soup_price_rows(html))
+
+if __name__ == '__main__':
+    unittest.main()
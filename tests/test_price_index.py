@@ -0,0 +1,132 @@
+import unittest
+
+from price_index import PriceIndex, QueryError, decode_cursor, encode_cursor
+
+def record(state, commodity, market, variety, modal):
+    return {"State": state, "Commodity": commodity, "Market": market, "Variety": variety,
+            "Min Price": modal, "Max Price": modal, "Modal Price": modal}
+
+RECORDS = [
+    record("Karnataka", "Onion", "Bangalore", "Local", "1200"),
+    record("Karnataka", "Onion", "Mysore", "Local", "1,500"),
+    record("Karnataka", "Potato", "Bangalore", "Hybrid", "900"),
+    record("Kerala", "Onion", "Aluva", "Other", "2000"),
+    record("Kerala", "Potato", "Kottayam, Pala", "Local", ""),
+    record("Kerala", "Potato", "Aluva", "Local", "NR"),
+    record("Goa", "Onion", "Panaji", "Local", "1200"),
+    record("Goa", "Rice", "Margao", "Fine", "3100"),
+]
+
+def markets(records):
+    return [r["Market"] for r in records]
+
+class PriceIndexQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.index = PriceIndex(RECORDS)
+
+    def test_filters_intersect_and_ignore_case(self):
+        records, total, _ = self.index.query({"state": ["karnataka", "GOA"], "commodity": ["onion"]})
+        self.assertEqual(total, 3)
+        self.assertEqual(sorted(markets(records)), ["Bangalore", "Mysore", "Panaji"])
+
+    def test_filter_value_with_comma(self):
+        records, total, _ = self.index.query({"market": ["Kottayam, Pala"]})
+        self.assertEqual(markets(records), ["Kottayam, Pala"])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.query({"state": ["Kerala"], "commodity": ["Rice"]}), ([], 0, None))
+
+    def test_modal_range_is_inclusive(self):
+        records, total, _ = self.index.query({}, min_modal=1200, max_modal=1500)
+        self.assertEqual(total, 3)
+        self.assertEqual(sorted(markets(records)), ["Bangalore", "Mysore", "Panaji"])
+
+    def test_numeric_sort_puts_unparseable_prices_last(self):
+        records, _, _ = self.index.query({}, sort="modal_price")
+        self.assertEqual([r["Modal Price"] for r in records],
+                         ["900", "1200", "1200", "1,500", "2000", "3100", "NR", ""])
+        records, _, _ = self.index.query({}, sort="modal_price", descending=True)
+        self.assertEqual([r["Modal Price"] for r in records][:2], ["", "NR"])
+
+    def test_text_sort(self):
+        records, _, _ = self.index.query({"commodity": ["Potato"]}, sort="market")
+        self.assertEqual(markets(records), ["Aluva", "Bangalore", "Kottayam, Pala"])
+
+    def test_unknown_sort(self):
+        with self.assertRaises(QueryError):
+            self.index.query({}, sort="price_date")
+
+class PriceIndexPagingTest(unittest.TestCase):
+    def setUp(self):
+        self.index = PriceIndex(RECORDS)
+
+    def pages(self, limit, **options):
+        seen, cursor = [], None
+        while True:
+            records, total, cursor = self.index.query({}, limit=limit, cursor=cursor, **options)
+            seen.extend(records)
+            if cursor is None:
+                return seen, total
+
+    def test_pages_cover_every_record_once(self):
+        for sort in ("modal_price", "min_price", "state", "market", "variety"):
+            for descending in (False, True):
+                with self.subTest(sort=sort, descending=descending):
+                    expected, _, _ = self.index.query({}, sort=sort, descending=descending, limit=100)
+                    for limit in (1, 3, len(RECORDS)):
+                        seen, total = self.pages(limit, sort=sort, descending=descending)
+                        self.assertEqual(total, len(RECORDS))
+                        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        _, _, cursor = self.index.query({}, limit=len(RECORDS))
+        self.assertIsNone(cursor)
+
+class CursorTest(unittest.TestCase):
+    def setUp(self):
+        self.index = PriceIndex(RECORDS)
+
+    def test_round_trip(self):
+        key = ((0, 1200.0), ("Goa", "Onion", "Panaji", "Local"))
+        self.assertEqual(decode_cursor(encode_cursor(key)), key)
+
+    def test_malformed_cursors(self):
+        for key in ([[0, 1200.0], [1, 2, 3, 4]], [[0, 1200.0], ["a", "b", "c"]], [[0, [1]], ["a", "b", "c", "d"]],
+                    [[True, 1.0], ["a", "b", "c", "d"]], [[0, 1.0], "abcd"], [1, 2], "cursor"):
+            with self.subTest(key=key), self.assertRaises(QueryError):
+                self.index.query({}, cursor=encode_cursor(key))
+        with self.assertRaises(QueryError):
+            self.index.query({}, cursor="not base64!")
+
+    def test_cursor_from_another_sort(self):
+        _, _, cursor = self.index.query({}, sort="market", limit=1)
+        with self.assertRaises(QueryError):
+            self.index.query({}, sort="modal_price", cursor=cursor)
+
+class RequestEndpointTest(unittest.TestCase):
+    YEAR, MONTH = 2020, 1
+
+    @classmethod
+    def setUpClass(cls):
+        import APIwebScrapingPopUp as app_module
+        for state in ("Karnataka", "Kerala", "Goa"):
+            for commodity in ("Onion", "Potato", "Rice"):
+                records = [r for r in RECORDS if r["State"] == state and r["Commodity"] == commodity]
+                app_module.price_store.replace_slice(state, commodity, cls.YEAR, cls.MONTH, records)
+        cls.client = app_module.app.test_client()
+
+    def get(self, query):
+        return self.client.get(f"/request?year={self.YEAR}&month={self.MONTH}&{query}")
+
+    def test_malformed_cursor_is_a_400(self):
+        response = self.get("cursor=" + encode_cursor([[0, 1200.0], [1, 2, 3, 4]]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Invalid cursor"})
+
+    def test_repeated_filters_keep_commas(self):
+        response = self.get("market=Kottayam,%20Pala&market=Panaji")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(markets(response.get_json()["data"])), ["Kottayam, Pala", "Panaji"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+
+import APIwebScrapingPopUp as app_module
+
+def record(market, modal):
+    return {"Market": market, "Variety": "Local", "Min Price": modal, "Max Price": modal, "Modal Price": modal}
+
+class StoredStreamTest(unittest.TestCase):
+    YEAR, MONTH = 2019, 6
+
+    @classmethod
+    def setUpClass(cls):
+        store = app_module.price_store
+        store.replace_slice("Assam", "Tea", cls.YEAR, cls.MONTH, [])
+        store.replace_slice("Goa", "Onion", cls.YEAR, cls.MONTH, [record("Panaji", "1200"), record("Margao", "1300")])
+        store.replace_slice("Goa", "Rice", cls.YEAR, cls.MONTH, [])
+        store.replace_slice("Kerala", "Onion", cls.YEAR, cls.MONTH, [record("Aluva", "2000")])
+        store.replace_slice("Kerala", "Potato", cls.YEAR, cls.MONTH, [])
+
+    def test_empty_slices_appear_inline_like_the_live_stream(self):
+        lines = [json.loads(line) for line in app_module.stream_stored_records(self.YEAR, self.MONTH)]
+        summary = [(line["State"], line["Commodity"], line.get("Status") or line["Market"]) for line in lines]
+        self.assertEqual(summary, [
+            ("Assam", "Tea", "empty"),
+            ("Goa", "Onion", "Panaji"),
+            ("Goa", "Onion", "Margao"),
+            ("Goa", "Rice", "empty"),
+            ("Kerala", "Onion", "Aluva"),
+            ("Kerala", "Potato", "empty"),
+        ])
+        self.assertEqual(lines[0], {"State": "Assam", "Commodity": "Tea", "Status": "empty"})
+
+if __name__ == '__main__':
+    unittest.main()